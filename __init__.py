@@ -1,15 +1,23 @@
 from __future__ import annotations
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from typing import TYPE_CHECKING
 
 from .const import DOMAIN
 
+# Home Assistant is only imported when the integration is set up, so the HA free
+# core (see core.py) and the command line tool can import this package without it
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
 PLATFORMS: list[str] = ["sensor", "button"]
 
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    from .services import async_setup_services
+
     hass.data.setdefault(DOMAIN, {})
+    async_setup_services(hass)
     return True
 
 
@@ -21,3 +29,10 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    from .storage import CurveStorage
+
+    # the learned curve and any run checkpoint go with the entry
+    await CurveStorage(hass, entry.entry_id).remove()
@@ -0,0 +1,97 @@
+"""Offline accuracy of the integration methods versus the power report interval.
+
+A synthetic appliance cycle with steps, ramps and a modulating motor is sampled
+at several report intervals and binned with each integration method. The
+result is compared with a fine grained reference integration.
+
+    python benchmarks/integration_accuracy.py --bucket-minutes 5
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import math
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_spec = importlib.util.spec_from_file_location(
+    "power_curve_integration", Path(__file__).resolve().parent.parent / "integration.py"
+)
+integration = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(integration)
+
+CYCLE_S = 2 * 3600
+
+
+def power_at(t: float) -> float:
+    # fill and pre wash, motor only
+    if t < 600:
+        return 120.0 + 40.0 * math.sin(t / 20.0)
+    # heater switches on and ramps while the element heats up
+    if t < 2400:
+        return 120.0 + min(1.0, (t - 600) / 180.0) * 1900.0
+    # main wash, modulating motor with short bursts
+    if t < 4200:
+        burst = 600.0 if int(t) % 300 < 40 else 0.0
+        return 150.0 + 60.0 * math.sin(t / 45.0) + burst
+    # second heating phase, thermostat slowly backs off
+    if t < 5400:
+        return 2000.0 - (t - 4200) / 1200.0 * 900.0
+    # drying, fan ramps down to standby
+    return max(5.0, 300.0 - (t - 5400) / 1800.0 * 295.0)
+
+
+def reference_buckets(bucket_s: int, step_s: float = 0.25) -> list[float]:
+    out = [0.0] * math.ceil(CYCLE_S / bucket_s)
+    t = 0.0
+    while t < CYCLE_S:
+        out[int(t // bucket_s)] += power_at(t + step_s / 2) * step_s / 3_600_000.0
+        t += step_s
+    return out
+
+
+def sampled_buckets(method: str, interval_s: int, bucket_s: int) -> list[float]:
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    times = list(range(0, CYCLE_S, interval_s)) + [CYCLE_S]
+    buckets: list[float] = []
+    for t0, t1 in zip(times, times[1:]):
+        p0 = power_at(t0)
+        p1 = power_at(t1)
+        integration.add_energy_slice_to_buckets(
+            start,
+            buckets,
+            start + timedelta(seconds=t0),
+            start + timedelta(seconds=t1),
+            p0,
+            bucket_s,
+            integration.segment_end_power(method, p0, p1),
+        )
+    return buckets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bucket-minutes", type=int, default=5)
+    parser.add_argument("--intervals", type=int, nargs="+", default=[1, 5, 10, 30, 60, 120, 300])
+    args = parser.parse_args()
+
+    bucket_s = args.bucket_minutes * 60
+    ref = reference_buckets(bucket_s)
+    ref_total = sum(ref)
+
+    print(f"reference energy {ref_total:.4f} kWh in {len(ref)} buckets of {args.bucket_minutes} min")
+    print(f"{'interval_s':>10} {'method':>12} {'total_err_%':>12} {'bucket_mae_wh':>14} {'bucket_max_wh':>14}")
+    for interval_s in args.intervals:
+        for method in integration.INTEGRATION_METHODS:
+            got = sampled_buckets(method, interval_s, bucket_s)
+            got += [0.0] * (len(ref) - len(got))
+            errs = [abs(a - b) * 1000.0 for a, b in zip(got, ref)]
+            total_err = (sum(got) - ref_total) / ref_total * 100.0
+            print(
+                f"{interval_s:>10} {method:>12} {total_err:>12.3f} "
+                f"{sum(errs) / len(errs):>14.3f} {max(errs):>14.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import os
+import sys
+from array import array
+from typing import Any
+
+# Portable curve bundle, gzip compressed JSON with the numeric arrays packed as
+# little endian base64. Kept free of Home Assistant imports.
+
+BUNDLE_FORMAT = "power_curve_profiles_bundle"
+BUNDLE_VERSION = 1
+
+_FLOAT_ARRAYS = ("mean_kwh_per_interval", "last_run_kwh_per_interval", "bucket_m2")
+_INT_ARRAYS = ("bucket_counts", "m2_counts")
+
+
+def _pack(values: list[Any], typecode: str) -> str:
+    arr = array(typecode, values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return base64.b64encode(arr.tobytes()).decode("ascii")
+
+
+def _unpack(raw: str, typecode: str) -> list[Any]:
+    arr = array(typecode)
+    arr.frombytes(base64.b64decode(raw))
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tolist()
+
+
+def encode_profile(name: str, state: dict[str, Any], **meta: Any) -> dict[str, Any]:
+    packed = dict(state)
+    for key in _FLOAT_ARRAYS:
+        packed[key] = _pack([float(v) for v in state.get(key, [])], "d")
+    for key in _INT_ARRAYS:
+        packed[key] = _pack([int(v) for v in state.get(key, [])], "I")
+    packed["quarantined_runs"] = [
+        {**run, "kwh_per_interval": _pack([float(v) for v in run.get("kwh_per_interval", [])], "d")}
+        for run in state.get("quarantined_runs", [])
+    ]
+    return {"name": name, **meta, "state": packed}
+
+
+def decode_profile(profile: dict[str, Any]) -> dict[str, Any]:
+    state = dict(profile.get("state") or {})
+    for key in _FLOAT_ARRAYS:
+        if isinstance(state.get(key), str):
+            state[key] = _unpack(state[key], "d")
+    for key in _INT_ARRAYS:
+        if isinstance(state.get(key), str):
+            state[key] = _unpack(state[key], "I")
+    state["quarantined_runs"] = [
+        {**run, "kwh_per_interval": _unpack(run["kwh_per_interval"], "d")}
+        if isinstance(run.get("kwh_per_interval"), str)
+        else run
+        for run in state.get("quarantined_runs", [])
+        if isinstance(run, dict)
+    ]
+    return state
+
+
+def write_bundle(path: str, profiles: list[dict[str, Any]]) -> None:
+    bundle = {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "profiles": profiles}
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(bundle, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_bundle(path: str) -> list[dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        bundle = json.load(f)
+
+    if not isinstance(bundle, dict) or bundle.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"{path} is not a power curve bundle")
+    version = bundle.get("version")
+    if not isinstance(version, int) or version > BUNDLE_VERSION:
+        raise ValueError(f"Unsupported power curve bundle version {version}")
+
+    profiles = bundle.get("profiles")
+    if not isinstance(profiles, list):
+        raise ValueError(f"{path} has no profiles")
+    return [p for p in profiles if isinstance(p, dict) and p.get("name")]
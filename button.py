@@ -6,7 +6,8 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN
-from .storage import CurveStorage, CurveState
+from .curve_state import CurveState
+from .storage import CurveStorage
 
 
 async def async_setup_entry(
@@ -14,7 +15,10 @@ async def async_setup_entry(
     entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    async_add_entities([PowerCurveResetButton(hass, entry)], update_before_add=False)
+    async_add_entities(
+        [PowerCurveResetButton(hass, entry), PowerCurveAcceptQuarantinedButton(hass, entry)],
+        update_before_add=False,
+    )
 
 
 class PowerCurveResetButton(ButtonEntity):
@@ -39,3 +43,22 @@ class PowerCurveResetButton(ButtonEntity):
         sensor = domain_data.get(self.entry.entry_id)
         if sensor is not None:
             await sensor.async_reset_curve_state()
+
+
+class PowerCurveAcceptQuarantinedButton(ButtonEntity):
+    _attr_icon = "mdi:check-decagram"
+    _attr_has_entity_name = True
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        self.hass = hass
+        self.entry = entry
+
+        self._attr_unique_id = f"{DOMAIN}:{entry.entry_id}:accept_quarantined"
+        self._attr_name = "Accept quarantined runs"
+
+    async def async_press(self) -> None:
+        # Quarantined runs live in the sensor's tracker, which learns them into the curve
+        domain_data = self.hass.data.get(DOMAIN, {})
+        sensor = domain_data.get(self.entry.entry_id)
+        if sensor is not None:
+            await sensor.async_accept_quarantined_runs()
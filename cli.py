@@ -0,0 +1,269 @@
+"""Offline curve learning and cost tables, without Home Assistant.
+
+    python -m power_curve_profiles.cli learn trace.csv.gz --standby-w 5 --wait-time-s 300 --out curve.json
+    python -m power_curve_profiles.cli costs curve.json --prices prices.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import gzip
+import json
+import sys
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, ContextManager, Iterator, TextIO
+
+from .bundle import decode_profile, encode_profile, read_bundle, write_bundle
+from .const import BUCKET_MINUTES, BUCKET_MINUTES_OPTIONS
+from .curve_state import CurveState
+from .curve_tracker import CurveTracker
+from .integration import INTEGRATION_LEFT, INTEGRATION_METHODS
+from .price_calc import PriceTimeline, best_start, compute_day_start_costs, parse_tibber_prices_attributes
+
+_TS_KEYS = ("ts", "timestamp", "time", "last_updated", "last_changed")
+_POWER_KEYS = ("power_w", "power", "state", "value")
+
+
+def _open_text(path: str) -> ContextManager[TextIO]:
+    # callers use with, which must not close stdin
+    if path == "-":
+        return nullcontext(sys.stdin)
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def _base_suffix(path: str) -> str:
+    p = Path(path[:-3] if path.endswith(".gz") else path)
+    return p.suffix.lower()
+
+
+def _profile_name(path: str) -> str:
+    name = Path(path).name
+    for suffix in (".gz", ".jsonl", ".json", ".csv"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return name or "stdin"
+
+
+def _parse_ts(raw: Any) -> datetime | None:
+    try:
+        ts = datetime.fromtimestamp(float(raw), timezone.utc)
+    except (TypeError, ValueError):
+        try:
+            ts = datetime.fromisoformat(str(raw).strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+def _pick(row: dict[str, Any], keys: tuple[str, ...]) -> Any:
+    for key in keys:
+        if key in row:
+            return row[key]
+    return None
+
+
+def iter_power_samples(path: str) -> Iterator[tuple[datetime, str | None]]:
+    # streams (timestamp, power) pairs from CSV with a header or from JSON lines
+    with _open_text(path) as f:
+        if _base_suffix(path) == ".jsonl":
+            rows: Iterator[dict[str, Any]] = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            ts = _parse_ts(_pick(row, _TS_KEYS))
+            if ts is None:
+                continue
+            value = _pick(row, _POWER_KEYS)
+            yield ts, None if value is None else str(value)
+
+
+async def learn_trace(
+    path: str,
+    standby_w: float,
+    wait_time_s: int,
+    expected_runtime_s: int = 0,
+    bucket_minutes: int = BUCKET_MINUTES,
+    integration_method: str = INTEGRATION_LEFT,
+    initial: CurveState | None = None,
+) -> CurveTracker:
+    async def _persist() -> None:
+        return None
+
+    # no timers offline, replay_power_history applies the cutoff from the sample timestamps
+    tracker = CurveTracker(
+        standby_w=standby_w,
+        wait_time_s=wait_time_s,
+        expected_runtime_s=expected_runtime_s,
+        schedule_call_later=lambda delay_s, cb: (lambda: None),
+        on_state_updated=lambda: None,
+        on_persist_requested=_persist,
+        fast_ingest=True,
+        bucket_minutes=bucket_minutes,
+        integration_method=integration_method,
+    )
+    if initial is not None:
+        await tracker.load_state(initial)
+
+    await tracker.replay_power_history(iter_power_samples(path))
+    return tracker
+
+
+def load_curves(path: str) -> list[tuple[str, CurveState]]:
+    if path.endswith(".gz"):
+        return [(str(p["name"]), CurveState.from_dict(decode_profile(p))) for p in read_bundle(path)]
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} does not hold a curve")
+    if "mean_kwh_per_interval" in data:
+        return [(_profile_name(path), CurveState.from_dict(data))]
+    return [(str(name), CurveState.from_dict(state)) for name, state in data.items() if isinstance(state, dict)]
+
+
+def load_prices(path: str) -> PriceTimeline | None:
+    with _open_text(path) as f:
+        if _base_suffix(path) == ".csv":
+            data: Any = list(csv.DictReader(f))
+        else:
+            data = json.load(f)
+
+    if isinstance(data, dict):
+        return parse_tibber_prices_attributes(data)
+
+    # a flat list of {startsAt, total} rows, the first date is today
+    entries = [row for row in data if isinstance(row, dict)]
+    if not entries:
+        return None
+    first = _parse_ts(entries[0].get("startsAt"))
+    today: list[dict[str, Any]] = []
+    tomorrow: list[dict[str, Any]] = []
+    for row in entries:
+        ts = _parse_ts(row.get("startsAt"))
+        if ts is None or first is None:
+            continue
+        days = (ts.date() - first.date()).days
+        if days == 0:
+            today.append(row)
+        elif days == 1:
+            tomorrow.append(row)
+    return parse_tibber_prices_attributes({"today": today, "tomorrow": tomorrow})
+
+
+def _cmd_learn(args: argparse.Namespace) -> int:
+    initial: dict[str, CurveState] = {}
+    if args.state:
+        initial = dict(load_curves(args.state))
+
+    results: list[tuple[str, CurveState]] = []
+    for path in args.traces:
+        name = _profile_name(path)
+        seed = initial.get(name) or (next(iter(initial.values())) if len(initial) == 1 else None)
+        if seed is not None:
+            # every trace learns into its own copy, a shared seed would pile all traces into one curve
+            seed = CurveState.from_dict(seed.to_dict())
+        tracker = asyncio.run(
+            learn_trace(
+                path,
+                standby_w=args.standby_w,
+                wait_time_s=args.wait_time_s,
+                expected_runtime_s=args.expected_runtime_s,
+                bucket_minutes=args.bucket_minutes,
+                integration_method=args.integration_method,
+                initial=seed,
+            )
+        )
+        if tracker.run.in_run:
+            print(f"{path}: trace ends during a run, the open run was not learned", file=sys.stderr)
+        results.append((name, tracker.curve_state))
+        print(f"{path}: {tracker.curve_state.runs} runs", file=sys.stderr)
+
+    if args.out and args.out.endswith(".gz"):
+        write_bundle(args.out, [encode_profile(name, state.to_dict()) for name, state in results])
+        return 0
+
+    if len(results) == 1:
+        payload: Any = results[0][1].to_dict()
+    else:
+        payload = {name: state.to_dict() for name, state in results}
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+    else:
+        json.dump(payload, sys.stdout)
+        sys.stdout.write("\n")
+    return 0
+
+
+def _cmd_costs(args: argparse.Namespace) -> int:
+    curves = load_curves(args.curve)
+    if args.profile:
+        curves = [(name, state) for name, state in curves if name == args.profile]
+        if not curves:
+            print(f"profile {args.profile} not found in {args.curve}", file=sys.stderr)
+            return 1
+
+    timeline = load_prices(args.prices)
+    if timeline is None or not timeline.all_quarters:
+        print(f"no prices found in {args.prices}", file=sys.stderr)
+        return 1
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["profile", "day", "quarter_index", "start", "cost"])
+
+    for name, state in curves:
+        today, tomorrow = compute_day_start_costs(
+            state.mean_kwh_per_interval, timeline.all_quarters, state.bucket_minutes
+        )
+        for day, costs in (("today", today), ("tomorrow", tomorrow)):
+            if args.best:
+                i, cost = best_start(costs)
+                rows = [] if i is None else [(i, cost)]
+            else:
+                rows = list(enumerate(costs))
+            for q, cost in rows:
+                start = f"{q // 4:02d}:{q % 4 * 15:02d}"
+                writer.writerow([name, day, q, start, "" if cost is None else round(cost, 6)])
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="power_curve_profiles", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    learn = sub.add_parser("learn", help="learn curves from power traces, CSV or JSON lines, optionally gzipped")
+    learn.add_argument("traces", nargs="+", help="one trace per device, columns ts and power_w")
+    learn.add_argument("--standby-w", type=float, required=True)
+    learn.add_argument("--wait-time-s", type=int, required=True)
+    learn.add_argument("--expected-runtime-s", type=int, default=0)
+    learn.add_argument("--bucket-minutes", type=int, choices=BUCKET_MINUTES_OPTIONS, default=BUCKET_MINUTES)
+    learn.add_argument("--integration-method", choices=INTEGRATION_METHODS, default=INTEGRATION_LEFT)
+    learn.add_argument("--state", help="curve JSON or bundle to continue learning from")
+    learn.add_argument("--out", help="output JSON, or a bundle when it ends in .gz, stdout by default")
+    learn.set_defaults(func=_cmd_learn)
+
+    costs = sub.add_parser("costs", help="cost of every quarter hour start for learned curves")
+    costs.add_argument("curve", help="curve JSON or bundle")
+    costs.add_argument("--prices", required=True, help="Tibber style JSON with today and tomorrow, or CSV startsAt,total")
+    costs.add_argument("--profile", help="only this profile of a bundle")
+    costs.add_argument("--best", action="store_true", help="only the cheapest start per day")
+    costs.set_defaults(func=_cmd_costs)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
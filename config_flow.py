@@ -4,11 +4,15 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.helpers.selector import (
+    BooleanSelector,
     EntitySelector,
     EntitySelectorConfig,
     NumberSelector,
     NumberSelectorConfig,
     NumberSelectorMode,
+    SelectSelector,
+    SelectSelectorConfig,
+    SelectSelectorMode,
     TextSelector,
     TextSelectorConfig,
 )
@@ -21,7 +25,13 @@ from .const import (
     CONF_WAIT_TIME_S,
     CONF_EXPECTED_RUNTIME_S,
     CONF_PRICE_ENTITY,
+    CONF_FAST_INGEST,
+    CONF_BUCKET_MINUTES,
+    BUCKET_MINUTES,
+    BUCKET_MINUTES_OPTIONS,
+    CONF_INTEGRATION_METHOD,
 )
+from .integration import INTEGRATION_LEFT, INTEGRATION_METHODS
 
 
 class PowerCurveProfilesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -43,7 +53,9 @@ class PowerCurveProfilesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             else:
                 title = user_input.get(CONF_NAME) or f"Power curve {power_entity} (threshold stop)"
 
-            return self.async_create_entry(title=title, data=user_input)
+            data = dict(user_input)
+            data[CONF_BUCKET_MINUTES] = int(data.get(CONF_BUCKET_MINUTES, BUCKET_MINUTES))
+            return self.async_create_entry(title=title, data=data)
 
         schema = vol.Schema(
             {
@@ -81,6 +93,19 @@ class PowerCurveProfilesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 vol.Optional(CONF_PRICE_ENTITY): EntitySelector(
                     EntitySelectorConfig(domain="sensor")
                 ),
+                vol.Optional(CONF_FAST_INGEST, default=False): BooleanSelector(),
+                vol.Optional(CONF_BUCKET_MINUTES, default=str(BUCKET_MINUTES)): SelectSelector(
+                    SelectSelectorConfig(
+                        options=[str(m) for m in BUCKET_MINUTES_OPTIONS],
+                        mode=SelectSelectorMode.DROPDOWN,
+                    )
+                ),
+                vol.Optional(CONF_INTEGRATION_METHOD, default=INTEGRATION_LEFT): SelectSelector(
+                    SelectSelectorConfig(
+                        options=INTEGRATION_METHODS,
+                        mode=SelectSelectorMode.DROPDOWN,
+                    )
+                ),
             }
         )
 
@@ -9,8 +9,42 @@ CONF_EXPECTED_RUNTIME_S = "expected_runtime_s"
 # Optional, price entity like sensor.tibber_prices
 CONF_PRICE_ENTITY = "price_entity"
 
+# Optional, accumulate energy per bucket instead of splitting every power update
+CONF_FAST_INGEST = "fast_ingest"
+
+# Optional, curve bucket resolution in minutes, must divide the 15 minute price slot
+CONF_BUCKET_MINUTES = "bucket_minutes"
+
+# Optional, how power is assumed to behave between two sensor updates
+CONF_INTEGRATION_METHOD = "integration_method"
+
 BUCKET_MINUTES = 5
 BUCKET_SECONDS = BUCKET_MINUTES * 60
+BUCKET_MINUTES_OPTIONS = [1, 5, 15]
+
+# Cost projections whose estimated work (curve buckets x start slots) exceeds
+# this are computed in the executor instead of on the event loop
+COST_EXECUTOR_THRESHOLD = 20_000
+
+# Completed runs are scored against the per bucket mean and variance once the
+# curve has this many runs, a score above the threshold quarantines the run
+ANOMALY_MIN_RUNS = 3
+ANOMALY_SCORE_THRESHOLD = 3.0
+# Lower bound for the per bucket standard deviation, as a fraction of the average bucket energy
+ANOMALY_STD_FLOOR_FRACTION = 0.1
+QUARANTINE_MAX_RUNS = 10
+# The last quarantined runs are admitted to the curve together once each of them
+# scores below the threshold against the others, the device has a new normal
+QUARANTINE_ADMIT_RUNS = 3
+
+EVENT_RUN_QUARANTINED = f"{DOMAIN}_run_quarantined"
 
 STORAGE_VERSION = 2
 STORAGE_KEY_PREFIX = f"{DOMAIN}_"
+
+# In progress run checkpoint, written at most once per bucket after this delay
+RUN_CHECKPOINT_VERSION = 1
+RUN_CHECKPOINT_KEY_SUFFIX = "_run"
+RUN_CHECKPOINT_DELAY_S = 30
+# Checkpoints older than this are discarded instead of resumed
+RUN_CHECKPOINT_MAX_AGE_S = 12 * 3600
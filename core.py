@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import importlib
+from typing import Any
+
+# Home Assistant free entry point for the learning and costing code. Names are
+# resolved on first access so importing this module stays cheap.
+
+_EXPORTS: dict[str, str] = {
+    "CurveState": ".curve_state",
+    "CurveTracker": ".curve_tracker",
+    "RunState": ".curve_tracker",
+    "PriceTimeline": ".price_calc",
+    "parse_tibber_prices_attributes": ".price_calc",
+    "compute_start_costs_quarters": ".price_calc",
+    "compute_day_start_costs": ".price_calc",
+    "best_start": ".price_calc",
+    "RunProgress": ".progress",
+    "resample_kwh": ".resample",
+    "resample_counts": ".resample",
+    "add_energy_slice_to_buckets": ".integration",
+    "INTEGRATION_METHODS": ".integration",
+    "encode_profile": ".bundle",
+    "decode_profile": ".bundle",
+    "read_bundle": ".bundle",
+    "write_bundle": ".bundle",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __package__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(__all__)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from .const import BUCKET_MINUTES
+
+
+@dataclass
+class CurveState:
+    runs: int
+    mean_kwh_per_interval: list[float]
+    bucket_counts: list[int]
+    last_run_kwh_per_interval: list[float]
+    last_run_total_kwh: float
+    last_run_duration_minutes: int
+    last_updated_iso: str
+    bucket_minutes: int = BUCKET_MINUTES
+    # Welford sum of squared deviations per bucket and the runs that fed it, variance is
+    # m2 / (m2_count - 1). Curves learned before the spread was kept start at 0 runs.
+    bucket_m2: list[float] = field(default_factory=list)
+    m2_counts: list[int] = field(default_factory=list)
+    last_run_anomaly_score: float | None = None
+    last_run_quarantined: bool = False
+    quarantined_runs: list[dict[str, Any]] = field(default_factory=list)
+
+    @staticmethod
+    def empty() -> "CurveState":
+        return CurveState(
+            runs=0,
+            mean_kwh_per_interval=[],
+            bucket_counts=[],
+            last_run_kwh_per_interval=[],
+            last_run_total_kwh=0.0,
+            last_run_duration_minutes=0,
+            last_updated_iso="",
+            bucket_minutes=BUCKET_MINUTES,
+        )
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "CurveState":
+        state = CurveState.empty()
+        state.runs = int(data.get("runs", 0))
+        state.mean_kwh_per_interval = list(data.get("mean_kwh_per_interval", []))
+
+        raw_counts = data.get("bucket_counts")
+        if isinstance(raw_counts, list) and raw_counts:
+            state.bucket_counts = [int(x) for x in raw_counts]
+        else:
+            state.bucket_counts = [state.runs] * len(state.mean_kwh_per_interval)
+
+        state.last_run_kwh_per_interval = list(data.get("last_run_kwh_per_interval", []))
+        state.last_run_total_kwh = float(data.get("last_run_total_kwh", 0.0))
+        state.last_run_duration_minutes = int(data.get("last_run_duration_minutes", 0))
+        state.last_updated_iso = str(data.get("last_updated_iso", ""))
+        state.bucket_minutes = int(data.get("bucket_minutes", BUCKET_MINUTES))
+
+        n = len(state.mean_kwh_per_interval)
+        raw_m2 = data.get("bucket_m2")
+        raw_m2_counts = data.get("m2_counts")
+        if (
+            isinstance(raw_m2, list)
+            and isinstance(raw_m2_counts, list)
+            and len(raw_m2) == n
+            and len(raw_m2_counts) == n
+        ):
+            state.bucket_m2 = [float(x) for x in raw_m2]
+            state.m2_counts = [int(x) for x in raw_m2_counts]
+        else:
+            state.bucket_m2 = [0.0] * n
+            state.m2_counts = [0] * n
+
+        raw_score = data.get("last_run_anomaly_score")
+        state.last_run_anomaly_score = None if raw_score is None else float(raw_score)
+        state.last_run_quarantined = bool(data.get("last_run_quarantined", False))
+
+        raw_quarantined = data.get("quarantined_runs")
+        if isinstance(raw_quarantined, list):
+            state.quarantined_runs = [dict(x) for x in raw_quarantined if isinstance(x, dict)]
+        return state
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "mean_kwh_per_interval": self.mean_kwh_per_interval,
+            "bucket_counts": self.bucket_counts,
+            "last_run_kwh_per_interval": self.last_run_kwh_per_interval,
+            "last_run_total_kwh": self.last_run_total_kwh,
+            "last_run_duration_minutes": self.last_run_duration_minutes,
+            "last_updated_iso": self.last_updated_iso,
+            "bucket_minutes": self.bucket_minutes,
+            "bucket_m2": self.bucket_m2,
+            "m2_counts": self.m2_counts,
+            "last_run_anomaly_score": self.last_run_anomaly_score,
+            "last_run_quarantined": self.last_run_quarantined,
+            "quarantined_runs": self.quarantined_runs,
+        }
@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import math
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Callable, Awaitable
+from typing import Any, Callable, Awaitable, Iterable
 
-from .const import BUCKET_SECONDS
-from .storage import CurveState
+from .const import (
+    ANOMALY_MIN_RUNS,
+    ANOMALY_SCORE_THRESHOLD,
+    ANOMALY_STD_FLOOR_FRACTION,
+    BUCKET_MINUTES,
+    QUARANTINE_ADMIT_RUNS,
+    QUARANTINE_MAX_RUNS,
+)
+from .integration import INTEGRATION_LEFT, add_energy_slice_to_buckets, segment_end_power
+from .resample import resample_counts, resample_kwh
+from .curve_state import CurveState
 
 
 def _parse_power_w(state_str: str | None) -> float | None:
@@ -19,32 +29,35 @@ def _parse_power_w(state_str: str | None) -> float | None:
         return None
 
 
-def _add_energy_slice_to_buckets(
-    run_start: datetime,
-    buckets_kwh: list[float],
-    t0: datetime,
-    t1: datetime,
-    power_w: float,
-) -> None:
-    if t1 <= t0:
-        return
-
-    cur = t0
-    while cur < t1:
-        seconds_from_start = (cur - run_start).total_seconds()
-        bucket_index = int(seconds_from_start // BUCKET_SECONDS)
-
-        bucket_end = run_start + timedelta(seconds=(bucket_index + 1) * BUCKET_SECONDS)
-        seg_end = bucket_end if bucket_end < t1 else t1
-
-        seg_seconds = (seg_end - cur).total_seconds()
-        seg_kwh = power_w * seg_seconds / 3_600_000.0
-
-        while len(buckets_kwh) <= bucket_index:
-            buckets_kwh.append(0.0)
-
-        buckets_kwh[bucket_index] += seg_kwh
-        cur = seg_end
+def _rms_z_score(run: list[float], mean: list[float], m2_counts: list[int], m2: list[float]) -> float:
+    # root mean square z score of the run against the per bucket mean and spread,
+    # buckets the curve never saw count as mean 0 so truncated and merged runs stand out
+    floor = ANOMALY_STD_FLOOR_FRACTION * sum(mean) / len(mean)
+    floor_var = max(floor * floor, 1e-12)
+
+    n = max(len(run), len(mean))
+    acc = 0.0
+    for i in range(n):
+        x = run[i] if i < len(run) else 0.0
+        mu = mean[i] if i < len(mean) else 0.0
+        c = m2_counts[i] if i < len(m2_counts) else 0
+        var = m2[i] / (c - 1) if c > 1 and i < len(m2) else 0.0
+        d = x - mu
+        acc += d * d / max(var, floor_var)
+    return math.sqrt(acc / n)
+
+
+def _welford(runs: list[list[float]]) -> tuple[list[float], list[int], list[float]]:
+    n = max(len(run) for run in runs)
+    mean = [0.0] * n
+    m2 = [0.0] * n
+    for k, run in enumerate(runs, start=1):
+        for i in range(n):
+            x = run[i] if i < len(run) else 0.0
+            delta = x - mean[i]
+            mean[i] += delta / k
+            m2[i] += delta * (x - mean[i])
+    return mean, [len(runs)] * n, m2
 
 
 def _iso_now_local(ts: datetime) -> str:
@@ -70,14 +83,27 @@ class CurveTracker:
         schedule_call_later,
         on_state_updated: Callable[[], None],
         on_persist_requested: Callable[[], Awaitable[None]],
+        fast_ingest: bool = False,
+        bucket_minutes: int = BUCKET_MINUTES,
+        integration_method: str = INTEGRATION_LEFT,
+        on_checkpoint_requested: Callable[[], None] | None = None,
+        on_bucket_boundary: Callable[[datetime], None] | None = None,
+        on_run_quarantined: Callable[[dict[str, Any]], None] | None = None,
     ) -> None:
         self.standby_w = float(standby_w)
         self.wait_time_s = int(wait_time_s)
+        self.bucket_minutes = int(bucket_minutes)
+        self.bucket_seconds = self.bucket_minutes * 60
+        self.integration_method = integration_method
 
         self._on_state_updated = on_state_updated
         self._on_persist_requested = on_persist_requested
+        self._on_checkpoint_requested = on_checkpoint_requested
+        self._on_bucket_boundary = on_bucket_boundary
+        self._on_run_quarantined = on_run_quarantined
 
         self.curve_state: CurveState = CurveState.empty()
+        self.curve_state.bucket_minutes = self.bucket_minutes
         self.run = RunState(in_run=False, run_start_ts=None, below_standby_since=None, current_run_buckets_kwh=[])
 
         self.last_ts: datetime | None = None
@@ -87,6 +113,18 @@ class CurveTracker:
         self._schedule_call_later = schedule_call_later
         self._cutoff_unsub = None
 
+        # Fast ingest keeps the energy of the open bucket in a plain float and only
+        # writes it into current_run_buckets_kwh on bucket boundaries and flushes
+        self.fast_ingest = bool(fast_ingest)
+        self._last_s = 0.0
+        self._acc_kwh = 0.0
+        self._acc_bucket = 0
+        self._acc_bucket_end_s = 0.0
+        self._acc_open = False
+
+        # buckets the run has fully passed, compared on every update to spot boundaries
+        self._completed_buckets = 0
+
     async def _hard_cutoff(self) -> None:
         if not self.run.in_run or self.run.run_start_ts is None:
             return
@@ -95,21 +133,227 @@ class CurveTracker:
 
         if self.last_ts is not None and self.last_power_w is not None:
             if cutoff_ts > self.last_ts:
-                _add_energy_slice_to_buckets(
-                    self.run.run_start_ts,
-                    self.run.current_run_buckets_kwh,
-                    self.last_ts,
-                    cutoff_ts,
-                    self.last_power_w,
-                )
-
-        self.last_ts = cutoff_ts
+                self._integrate_until(cutoff_ts)
+
+        self._set_last_ts(cutoff_ts)
         await self.finish_run(cutoff_ts)
 
+    def _arm_cutoff_timer(self, delay_s: float) -> None:
+        self._cancel_cutoff_timer()
+
+        async def _cutoff(_):
+            await self._hard_cutoff()
+        self._cutoff_unsub = self._schedule_call_later(delay_s, _cutoff)
+
+    def _request_checkpoint(self) -> None:
+        if self._on_checkpoint_requested is not None:
+            self._on_checkpoint_requested()
+
+    def completed_buckets(self, now: datetime) -> int:
+        if self.run.run_start_ts is None:
+            return 0
+        return max(0, int((now - self.run.run_start_ts).total_seconds() // self.bucket_seconds))
+
+    def run_snapshot(self) -> dict[str, Any]:
+        self.flush_ingest()
+
+        def iso(ts: datetime | None) -> str | None:
+            return None if ts is None else ts.isoformat()
+
+        return {
+            "in_run": self.run.in_run,
+            "run_start_ts": iso(self.run.run_start_ts),
+            "below_standby_since": iso(self.run.below_standby_since),
+            "current_run_buckets_kwh": list(self.run.current_run_buckets_kwh),
+            "last_ts": iso(self.last_ts),
+            "last_power_w": self.last_power_w,
+            "bucket_minutes": self.bucket_minutes,
+        }
+
+    def restore_run(self, data: dict[str, Any]) -> bool:
+        # a live run always wins over a checkpoint
+        if self.run.in_run:
+            return False
+        if not data.get("in_run") or int(data.get("bucket_minutes", 0)) != self.bucket_minutes:
+            return False
+
+        def parse(raw: Any) -> datetime | None:
+            if not raw:
+                return None
+            try:
+                return datetime.fromisoformat(str(raw))
+            except ValueError:
+                return None
+
+        run_start = parse(data.get("run_start_ts"))
+        last_ts = parse(data.get("last_ts"))
+        if run_start is None or last_ts is None or last_ts < run_start:
+            return False
+
+        try:
+            buckets = [float(x) for x in data.get("current_run_buckets_kwh", [])]
+            raw_power = data.get("last_power_w")
+            last_power_w = None if raw_power is None else float(raw_power)
+        except (TypeError, ValueError):
+            return False
+
+        self.run.in_run = True
+        self.run.run_start_ts = run_start
+        self.run.below_standby_since = parse(data.get("below_standby_since"))
+        self.run.current_run_buckets_kwh = buckets
+        self.last_power_w = last_power_w
+        self._set_last_ts(last_ts)
+        self._completed_buckets = self.completed_buckets(last_ts)
+
+        bucket_index = int((last_ts - run_start).total_seconds() // self.bucket_seconds)
+        self._acc_kwh = 0.0
+        self._acc_bucket = bucket_index
+        self._acc_bucket_end_s = run_start.timestamp() + (bucket_index + 1) * self.bucket_seconds
+        self._acc_open = False
+        return True
+
+    def _cutoff_ts(self) -> datetime | None:
+        if not self.run.in_run or self.run.run_start_ts is None or self.expected_runtime_s <= 0:
+            return None
+        return self.run.run_start_ts + timedelta(seconds=self.expected_runtime_s)
+
+    async def replay_power_history(
+        self,
+        samples: Iterable[tuple[datetime, str | None]],
+        restart_ts: datetime | None = None,
+    ) -> None:
+        # samples from restart_ts on were recorded after an outage, the last reading from
+        # before it is not integrated up to the first of them. A restart before the
+        # checkpoint, like an entry reload, leaves no outage in the window.
+        if restart_ts is not None and self.last_ts is not None and restart_ts < self.last_ts:
+            restart_ts = None
+
+        for ts, state_str in samples:
+            if self.last_ts is not None and ts <= self.last_ts:
+                continue
+            if restart_ts is not None and ts >= restart_ts:
+                self.forget_last_power()
+                restart_ts = None
+            cutoff_ts = self._cutoff_ts()
+            if cutoff_ts is not None and ts >= cutoff_ts:
+                await self._hard_cutoff()
+            await self.handle_power_change(None, state_str, ts)
+
+        if restart_ts is not None:
+            self.forget_last_power()
+
+    def forget_last_power(self) -> None:
+        # the power during an outage is unknown, the next sample starts a new segment
+        # instead of integrating the last reading across the gap
+        self.flush_ingest()
+        self.last_power_w = None
+
+    async def rearm_cutoff(self, now: datetime) -> None:
+        # the cutoff keeps counting from the original start, not from the restart
+        cutoff_ts = self._cutoff_ts()
+        if cutoff_ts is None:
+            return
+        remaining_s = (cutoff_ts - now).total_seconds()
+        if remaining_s <= 0:
+            await self._hard_cutoff()
+            return
+        self._arm_cutoff_timer(remaining_s)
+
+    def _set_last_ts(self, ts: datetime) -> None:
+        self.last_ts = ts
+        if self.fast_ingest:
+            self._last_s = ts.timestamp()
+
+    def _integrate_until(self, now: datetime, next_power_w: float | None = None) -> None:
+        if self.run.run_start_ts is None or self.last_ts is None or self.last_power_w is None:
+            return
+
+        power_w = self.last_power_w
+        end_w = segment_end_power(self.integration_method, power_w, next_power_w)
+
+        if not self.fast_ingest:
+            add_energy_slice_to_buckets(
+                self.run.run_start_ts,
+                self.run.current_run_buckets_kwh,
+                self.last_ts,
+                now,
+                power_w,
+                self.bucket_seconds,
+                end_w,
+            )
+            return
+
+        t1 = now.timestamp()
+        t0 = self._last_s
+        if t1 <= t0:
+            return
+        self._acc_open = True
+
+        if end_w == power_w:
+            while t1 > self._acc_bucket_end_s:
+                self._acc_kwh += power_w * (self._acc_bucket_end_s - t0) / 3_600_000.0
+                t0 = self._acc_bucket_end_s
+                self.flush_ingest()
+                self._acc_bucket += 1
+                self._acc_bucket_end_s += self.bucket_seconds
+                self._acc_open = True
+
+            self._acc_kwh += power_w * (t1 - t0) / 3_600_000.0
+            return
+
+        slope = (end_w - power_w) / (t1 - t0)
+        p0 = power_w
+        while t1 > self._acc_bucket_end_s:
+            p_b = p0 + slope * (self._acc_bucket_end_s - t0)
+            self._acc_kwh += (p0 + p_b) * 0.5 * (self._acc_bucket_end_s - t0) / 3_600_000.0
+            p0 = p_b
+            t0 = self._acc_bucket_end_s
+            self.flush_ingest()
+            self._acc_bucket += 1
+            self._acc_bucket_end_s += self.bucket_seconds
+            self._acc_open = True
+
+        self._acc_kwh += (p0 + end_w) * 0.5 * (t1 - t0) / 3_600_000.0
+
+    def flush_ingest(self) -> None:
+        # a bucket the run spent time in is written even without energy, like the slow path does
+        if not self._acc_open:
+            return
+        buckets = self.run.current_run_buckets_kwh
+        while len(buckets) <= self._acc_bucket:
+            buckets.append(0.0)
+        buckets[self._acc_bucket] += self._acc_kwh
+        self._acc_kwh = 0.0
+        self._acc_open = False
+
     async def load_state(self, state: CurveState) -> None:
+        if state.bucket_minutes != self.bucket_minutes:
+            src, dst = state.bucket_minutes, self.bucket_minutes
+            state.mean_kwh_per_interval = resample_kwh(state.mean_kwh_per_interval, src, dst)
+            state.bucket_counts = resample_counts(state.bucket_counts, src, dst)
+            state.last_run_kwh_per_interval = resample_kwh(state.last_run_kwh_per_interval, src, dst)
+            # spreads are not additive across buckets, relearn them at the new resolution
+            state.bucket_m2 = [0.0] * len(state.mean_kwh_per_interval)
+            state.m2_counts = [0] * len(state.mean_kwh_per_interval)
+            state.bucket_minutes = dst
         self.curve_state = state
         self._on_state_updated()
 
+    def stop(self) -> None:
+        self._cancel_cutoff_timer()
+
+    def reset_run(self) -> None:
+        self._cancel_cutoff_timer()
+        self.run.in_run = False
+        self.run.run_start_ts = None
+        self.run.below_standby_since = None
+        self.run.current_run_buckets_kwh = []
+        self.last_ts = None
+        self.last_power_w = None
+        self._acc_kwh = 0.0
+        self._acc_open = False
+        self._completed_buckets = 0
+
     def _cancel_cutoff_timer(self) -> None:
         if self._cutoff_unsub is not None:
             self._cutoff_unsub()
@@ -122,19 +366,29 @@ class CurveTracker:
         self.run.current_run_buckets_kwh = []
         self._cancel_cutoff_timer()
 
+        self._acc_kwh = 0.0
+        self._acc_bucket = 0
+        self._acc_bucket_end_s = now.timestamp() + self.bucket_seconds
+        self._acc_open = False
+        self._completed_buckets = 0
+
         if self.expected_runtime_s > 0:
-            async def _cutoff(_):
-                await self._hard_cutoff()
-            self._cutoff_unsub = self._schedule_call_later(self.expected_runtime_s, _cutoff)
+            self._arm_cutoff_timer(self.expected_runtime_s)
 
         self._on_state_updated()
+        self._request_checkpoint()
 
     def mark_below_standby(self, now: datetime) -> None:
         if self.run.below_standby_since is None:
+            self.flush_ingest()
             self.run.below_standby_since = now
+            self._request_checkpoint()
 
     def clear_below_standby(self) -> None:
-        self.run.below_standby_since = None
+        if self.run.below_standby_since is not None:
+            self.flush_ingest()
+            self.run.below_standby_since = None
+            self._request_checkpoint()
 
     def below_standby_long_enough(self, now: datetime) -> bool:
         if self.run.below_standby_since is None:
@@ -143,6 +397,7 @@ class CurveTracker:
 
     async def finish_run(self, now: datetime) -> None:
         self._cancel_cutoff_timer()
+        self.flush_ingest()
         self.run.in_run = False
 
         last_run = list(self.run.current_run_buckets_kwh)
@@ -152,12 +407,35 @@ class CurveTracker:
         if self.run.run_start_ts is not None:
             duration_minutes = int((now - self.run.run_start_ts).total_seconds() // 60)
 
-        self._update_running_mean(last_run)
+        score = self._anomaly_score(last_run)
+        quarantined = score is not None and score > ANOMALY_SCORE_THRESHOLD
+        finished_iso = _iso_now_local(now)
+
+        if quarantined:
+            record = {
+                "kwh_per_interval": last_run,
+                "total_kwh": total_kwh,
+                "duration_minutes": duration_minutes,
+                "anomaly_score": score,
+                "finished": finished_iso,
+            }
+            self.curve_state.quarantined_runs.append(record)
+            del self.curve_state.quarantined_runs[:-QUARANTINE_MAX_RUNS]
+            if self._quarantine_agrees():
+                self._admit_quarantined(QUARANTINE_ADMIT_RUNS)
+                quarantined = False
+        else:
+            self._update_running_mean(last_run)
 
         self.curve_state.last_run_kwh_per_interval = last_run
         self.curve_state.last_run_total_kwh = total_kwh
         self.curve_state.last_run_duration_minutes = duration_minutes
-        self.curve_state.last_updated_iso = _iso_now_local(now)
+        self.curve_state.last_run_anomaly_score = score
+        self.curve_state.last_run_quarantined = quarantined
+        self.curve_state.last_updated_iso = finished_iso
+
+        if quarantined and self._on_run_quarantined is not None:
+            self._on_run_quarantined(record)
 
         self._on_state_updated()
         await self._on_persist_requested()
@@ -165,39 +443,87 @@ class CurveTracker:
         self.run.run_start_ts = None
         self.run.below_standby_since = None
         self.run.current_run_buckets_kwh = []
+        self._request_checkpoint()
+
+    def _anomaly_score(self, run: list[float]) -> float | None:
+        # scored only once enough runs fed the spread, an unknown spread is not a zero one
+        state = self.curve_state
+        if max(state.m2_counts, default=0) < ANOMALY_MIN_RUNS or not state.mean_kwh_per_interval:
+            return None
+        return _rms_z_score(run, state.mean_kwh_per_interval, state.m2_counts, state.bucket_m2)
+
+    def _quarantine_agrees(self) -> bool:
+        # each of the last quarantined runs is scored against the others, scoring it
+        # against a spread that includes itself would let any group agree
+        recent = [r["kwh_per_interval"] for r in self.curve_state.quarantined_runs[-QUARANTINE_ADMIT_RUNS:]]
+        if len(recent) < QUARANTINE_ADMIT_RUNS or not any(recent):
+            return False
+
+        for j, run in enumerate(recent):
+            mean, counts, m2 = _welford(recent[:j] + recent[j + 1 :])
+            if not mean or _rms_z_score(run, mean, counts, m2) > ANOMALY_SCORE_THRESHOLD:
+                return False
+        return True
+
+    def _admit_quarantined(self, count: int) -> None:
+        # the newest quarantined runs go into the curve, oldest first
+        quarantined = self.curve_state.quarantined_runs
+        for record in quarantined[-count:]:
+            self._update_running_mean(list(record["kwh_per_interval"]))
+        del quarantined[-count:]
+        self.curve_state.last_run_quarantined = False
+
+    async def accept_quarantined_runs(self) -> int:
+        count = len(self.curve_state.quarantined_runs)
+        if count == 0:
+            return 0
+        self._admit_quarantined(count)
+        self._on_state_updated()
+        await self._on_persist_requested()
+        return count
 
     def _update_running_mean(self, new_run: list[float]) -> None:
         mean = self.curve_state.mean_kwh_per_interval
         counts = self.curve_state.bucket_counts
+        m2 = self.curve_state.bucket_m2
+        m2_counts = self.curve_state.m2_counts
 
         if len(mean) < len(new_run):
             mean.extend([0.0] * (len(new_run) - len(mean)))
         if len(counts) < len(new_run):
             counts.extend([0] * (len(new_run) - len(counts)))
+        if len(m2) < len(mean):
+            m2.extend([0.0] * (len(mean) - len(m2)))
+        if len(m2_counts) < len(mean):
+            m2_counts.extend([0] * (len(mean) - len(m2_counts)))
 
         for i, val in enumerate(new_run):
             counts[i] += 1
             c = counts[i]
-            mean[i] = mean[i] + (val - mean[i]) / c
+            delta = val - mean[i]
+            mean[i] = mean[i] + delta / c
+            m2[i] += delta * (val - mean[i])
+            m2_counts[i] += 1
 
         self.curve_state.runs += 1
         self.curve_state.mean_kwh_per_interval = mean
         self.curve_state.bucket_counts = counts
+        self.curve_state.bucket_m2 = m2
+        self.curve_state.m2_counts = m2_counts
 
     async def handle_power_change(self, old_state_str: str | None, new_state_str: str | None, now: datetime) -> None:
         new_w = _parse_power_w(new_state_str)
 
-        if self.last_ts is not None and self.last_power_w is not None:
-            if self.run.in_run and self.run.run_start_ts is not None:
-                _add_energy_slice_to_buckets(
-                    self.run.run_start_ts,
-                    self.run.current_run_buckets_kwh,
-                    self.last_ts,
-                    now,
-                    self.last_power_w,
-                )
-
-        self.last_ts = now
+        if self.run.in_run:
+            self._integrate_until(now, new_w)
+            completed = self.completed_buckets(now)
+            if completed != self._completed_buckets:
+                self._completed_buckets = completed
+                self._request_checkpoint()
+                if self._on_bucket_boundary is not None:
+                    self._on_bucket_boundary(now)
+
+        self._set_last_ts(now)
         self.last_power_w = new_w
 
         if new_w is None:
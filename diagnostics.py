@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    data: dict[str, Any] = {
+        "entry": {
+            "title": entry.title,
+            "data": dict(entry.data),
+        },
+    }
+
+    sensor = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if sensor is None:
+        data["loaded"] = False
+        return data
+
+    tracker = sensor.tracker
+    state = tracker.curve_state
+    run = tracker.run
+
+    data["loaded"] = True
+    data["curve_state"] = {
+        "runs": state.runs,
+        "buckets": len(state.mean_kwh_per_interval),
+        "last_run_buckets": len(state.last_run_kwh_per_interval),
+        "last_updated_iso": state.last_updated_iso,
+        "last_run_anomaly_score": state.last_run_anomaly_score,
+        "quarantined_runs": [
+            {k: v for k, v in run.items() if k != "kwh_per_interval"} for run in state.quarantined_runs
+        ],
+        "persisted_size_bytes": len(json.dumps(state.to_dict())),
+    }
+    data["run"] = {
+        "in_run": run.in_run,
+        "run_start_ts": None if run.run_start_ts is None else run.run_start_ts.isoformat(),
+        "below_standby_since": None if run.below_standby_since is None else run.below_standby_since.isoformat(),
+        "current_run_buckets": len(run.current_run_buckets_kwh or []),
+    }
+    data["performance"] = sensor.perf.as_dict()
+    return data
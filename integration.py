@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+# Kept free of Home Assistant and package imports so offline tools can load it on its own
+
+INTEGRATION_LEFT = "left"
+INTEGRATION_TRAPEZOIDAL = "trapezoidal"
+INTEGRATION_HYBRID = "hybrid"
+INTEGRATION_METHODS = [INTEGRATION_LEFT, INTEGRATION_TRAPEZOIDAL, INTEGRATION_HYBRID]
+
+# Hybrid treats a change larger than this fraction of the larger sample as a step,
+# a switching load holds its old power until the report, a ramp is interpolated
+HYBRID_STEP_FRACTION = 0.5
+
+
+def segment_end_power(method: str, power_w: float, next_power_w: float | None) -> float:
+    # power at the end of a segment that starts at power_w, equal to power_w for a step
+    if next_power_w is None or method == INTEGRATION_LEFT:
+        return power_w
+    if method == INTEGRATION_HYBRID:
+        peak = max(abs(power_w), abs(next_power_w))
+        if peak > 0 and abs(next_power_w - power_w) > HYBRID_STEP_FRACTION * peak:
+            return power_w
+    return next_power_w
+
+
+def add_energy_slice_to_buckets(
+    run_start: datetime,
+    buckets_kwh: list[float],
+    t0: datetime,
+    t1: datetime,
+    power_w: float,
+    bucket_seconds: int,
+    power_end_w: float | None = None,
+) -> None:
+    if t1 <= t0:
+        return
+
+    # power is linear from power_w at t0 to power_end_w at t1, constant when not given
+    span_s = (t1 - t0).total_seconds()
+    slope = 0.0 if power_end_w is None else (power_end_w - power_w) / span_s
+
+    cur = t0
+    while cur < t1:
+        seconds_from_start = (cur - run_start).total_seconds()
+        bucket_index = int(seconds_from_start // bucket_seconds)
+
+        bucket_end = run_start + timedelta(seconds=(bucket_index + 1) * bucket_seconds)
+        seg_end = bucket_end if bucket_end < t1 else t1
+
+        seg_seconds = (seg_end - cur).total_seconds()
+        if slope == 0.0:
+            seg_kwh = power_w * seg_seconds / 3_600_000.0
+        else:
+            p_a = power_w + slope * (cur - t0).total_seconds()
+            p_b = power_w + slope * (seg_end - t0).total_seconds()
+            seg_kwh = (p_a + p_b) * 0.5 * seg_seconds / 3_600_000.0
+
+        while len(buckets_kwh) <= bucket_index:
+            buckets_kwh.append(0.0)
+
+        buckets_kwh[bucket_index] += seg_kwh
+        cur = seg_end
@@ -4,6 +4,9 @@ from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any
 
+from .const import BUCKET_MINUTES
+from .resample import projection_minutes, resample_kwh
+
 
 @dataclass
 class PriceTimeline:
@@ -93,16 +96,18 @@ def parse_tibber_prices_attributes(attrs: dict[str, Any]) -> PriceTimeline | Non
 
 
 def compute_start_costs_quarters(
-    device_kwh_5m: list[float],
+    device_kwh: list[float],
     all_price_quarters: list[float],
     start_offset_quarters: int,
     start_count: int = 96,
+    bucket_minutes: int = BUCKET_MINUTES,
 ) -> list[float | None]:
-    if not device_kwh_5m:
+    if not device_kwh:
         return [0.0] * start_count
 
-    # device bucket i maps to quarter index start + (i // 3)
-    needed_quarters = (len(device_kwh_5m) + 2) // 3
+    # device bucket i maps to quarter index start + (i * bucket_minutes // 15),
+    # bucket_minutes must divide 15 so a bucket never straddles two quarters
+    needed_quarters = (len(device_kwh) * bucket_minutes + 14) // 15
 
     out: list[float | None] = []
     for s in range(start_count):
@@ -115,13 +120,54 @@ def compute_start_costs_quarters(
             continue
 
         cost = 0.0
-        for i, kwh in enumerate(device_kwh_5m):
-            q = base + (i // 3)
-            cost += kwh * all_price_quarters[q]
+        if bucket_minutes == 15:
+            for i, kwh in enumerate(device_kwh):
+                cost += kwh * all_price_quarters[base + i]
+        else:
+            for i, kwh in enumerate(device_kwh):
+                q = base + (i * bucket_minutes) // 15
+                cost += kwh * all_price_quarters[q]
         out.append(cost)
     return out
 
 
+def compute_day_start_costs(
+    device_kwh: list[float],
+    all_price_quarters: list[float],
+    bucket_minutes: int = BUCKET_MINUTES,
+) -> tuple[list[float | None], list[float | None]]:
+    # project on the coarsest grid that lines up with the price quarters
+    grid = projection_minutes(bucket_minutes)
+    device_kwh = resample_kwh(device_kwh, bucket_minutes, grid)
+
+    today = compute_start_costs_quarters(
+        device_kwh=device_kwh,
+        all_price_quarters=all_price_quarters,
+        start_offset_quarters=0,
+        start_count=96,
+        bucket_minutes=grid,
+    )
+    tomorrow = compute_start_costs_quarters(
+        device_kwh=device_kwh,
+        all_price_quarters=all_price_quarters,
+        start_offset_quarters=96,
+        start_count=96,
+        bucket_minutes=grid,
+    )
+    return today, tomorrow
+
+
+def estimate_cost_work(
+    device_kwh: list[float],
+    bucket_minutes: int = BUCKET_MINUTES,
+    start_count: int = 2 * 96,
+) -> int:
+    # inner loop iterations of compute_start_costs_quarters over both days
+    grid = projection_minutes(bucket_minutes)
+    buckets = (len(device_kwh) * bucket_minutes + grid - 1) // grid
+    return buckets * start_count
+
+
 def best_start(costs: list[float | None]) -> tuple[int | None, float | None]:
     best_i: int | None = None
     best_c: float | None = None
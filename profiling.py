@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any
+
+# Histogram bucket upper bounds in milliseconds, last bucket is open ended
+LATENCY_BOUNDS_MS: tuple[float, ...] = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 50.0, 100.0, 500.0)
+
+TIMED_HANDLE_POWER = "handle_power_change"
+TIMED_PARSE_PRICES = "parse_tibber_prices_attributes"
+TIMED_COMPUTE_COSTS = "compute_start_costs_quarters"
+TIMED_ATTRIBUTES = "attribute_serialization"
+TIMED_STORAGE_SAVE = "storage_save"
+
+TIMED_NAMES: tuple[str, ...] = (
+    TIMED_HANDLE_POWER,
+    TIMED_PARSE_PRICES,
+    TIMED_COMPUTE_COSTS,
+    TIMED_ATTRIBUTES,
+    TIMED_STORAGE_SAVE,
+)
+
+COUNTER_POWER_EVENTS = "power_events"
+COUNTER_RECOMPUTES = "cost_recomputes"
+COUNTER_RECOMPUTES_EXECUTOR = "cost_recomputes_executor"
+COUNTER_RECOMPUTES_DROPPED = "cost_recomputes_dropped"
+
+# Number of recent event timestamps kept to estimate the current event rate
+RATE_WINDOW = 64
+
+
+class LatencyStats:
+    __slots__ = ("count", "total_s", "max_s", "last_s", "histogram")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.last_s = 0.0
+        self.histogram = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total_s += seconds
+        self.last_s = seconds
+        if seconds > self.max_s:
+            self.max_s = seconds
+
+        ms = seconds * 1000.0
+        i = 0
+        for bound in LATENCY_BOUNDS_MS:
+            if ms <= bound:
+                break
+            i += 1
+        self.histogram[i] += 1
+
+    @property
+    def mean_ms(self) -> float | None:
+        if self.count == 0:
+            return None
+        return self.total_s * 1000.0 / self.count
+
+    def as_dict(self) -> dict[str, Any]:
+        labels = [f"<={b}ms" for b in LATENCY_BOUNDS_MS] + [f">{LATENCY_BOUNDS_MS[-1]}ms"]
+        mean = self.mean_ms
+        return {
+            "count": self.count,
+            "mean_ms": None if mean is None else round(mean, 4),
+            "max_ms": round(self.max_s * 1000.0, 4),
+            "last_ms": round(self.last_s * 1000.0, 4),
+            "histogram": dict(zip(labels, self.histogram)),
+        }
+
+
+class PerfStats:
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.timings: dict[str, LatencyStats] = {name: LatencyStats() for name in TIMED_NAMES}
+        self.counters: dict[str, int] = {
+            COUNTER_POWER_EVENTS: 0,
+            COUNTER_RECOMPUTES: 0,
+            COUNTER_RECOMPUTES_EXECUTOR: 0,
+            COUNTER_RECOMPUTES_DROPPED: 0,
+        }
+        self._power_event_times: deque[float] = deque(maxlen=RATE_WINDOW)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.timings[name].record(seconds)
+
+    def count(self, name: str) -> None:
+        self.counters[name] += 1
+
+    def power_event(self) -> None:
+        self.counters[COUNTER_POWER_EVENTS] += 1
+        self._power_event_times.append(time.monotonic())
+
+    def power_events_per_s(self) -> float | None:
+        times = self._power_event_times
+        if len(times) < 2:
+            return None
+        span = times[-1] - times[0]
+        if span <= 0:
+            return None
+        return (len(times) - 1) / span
+
+    def as_dict(self) -> dict[str, Any]:
+        uptime_s = time.monotonic() - self.started
+        rate = self.power_events_per_s()
+        avg_rate = self.counters[COUNTER_POWER_EVENTS] / uptime_s if uptime_s > 0 else None
+        return {
+            "uptime_s": round(uptime_s, 1),
+            "counters": dict(self.counters),
+            "power_events_per_s_recent": None if rate is None else round(rate, 4),
+            "power_events_per_s_average": None if avg_rate is None else round(avg_rate, 4),
+            "timings": {name: stats.as_dict() for name, stats in self.timings.items()},
+        }
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+# The run so far is compared with the same part of the mean curve, the remaining
+# part of the curve is scaled by that ratio within these bounds
+RATIO_MIN = 0.5
+RATIO_MAX = 2.0
+
+
+class RunProgress:
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.run_start: datetime | None = None
+        self.bucket_minutes = 0
+
+        self._energy_suffix: list[float] = [0.0]
+        self._cost_suffix: list[float | None] = [None]
+        self._done_index = 0
+        self._done_kwh = 0.0
+
+        self.completed_buckets = 0
+        self.remaining_kwh: float | None = None
+        self.remaining_minutes: int | None = None
+        self.remaining_cost: float | None = None
+        self.eta: datetime | None = None
+
+    def start(
+        self,
+        run_start: datetime,
+        mean_kwh: list[float],
+        bucket_minutes: int,
+        price_quarters: list[float] | None,
+        day_start: datetime | None,
+    ) -> None:
+        self.reset()
+        self.run_start = run_start
+        self.bucket_minutes = bucket_minutes
+
+        n = len(mean_kwh)
+        energy = [0.0] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            energy[i] = energy[i + 1] + mean_kwh[i]
+        self._energy_suffix = energy
+
+        # cost of the rest of the mean curve when it runs from this start, None as soon
+        # as one of the remaining buckets falls outside the price timeline
+        cost: list[float | None] = [None] * (n + 1)
+        if price_quarters is not None and day_start is not None:
+            offset_min = (run_start - day_start).total_seconds() / 60.0
+            cost[n] = 0.0
+            for i in range(n - 1, -1, -1):
+                q = int((offset_min + i * bucket_minutes) // 15)
+                nxt = cost[i + 1]
+                if nxt is None or q < 0 or q >= len(price_quarters):
+                    cost[i] = None
+                else:
+                    cost[i] = nxt + mean_kwh[i] * price_quarters[q]
+        self._cost_suffix = cost
+
+    def update(self, completed: int, buckets_kwh: list[float]) -> None:
+        # amortised O(1), only the buckets completed since the last call are summed
+        stop = min(completed, len(buckets_kwh))
+        while self._done_index < stop:
+            self._done_kwh += buckets_kwh[self._done_index]
+            self._done_index += 1
+        if self._done_index < completed:
+            self._done_index = completed
+
+        n = len(self._energy_suffix) - 1
+        if n == 0:
+            self.completed_buckets = completed
+            return
+
+        k = min(completed, n)
+        expected_done = self._energy_suffix[0] - self._energy_suffix[k]
+        ratio = 1.0
+        if expected_done > 0:
+            ratio = min(RATIO_MAX, max(RATIO_MIN, self._done_kwh / expected_done))
+
+        cost = self._cost_suffix[k]
+
+        self.completed_buckets = completed
+        self.remaining_kwh = self._energy_suffix[k] * ratio
+        self.remaining_minutes = (n - k) * self.bucket_minutes
+        self.remaining_cost = None if cost is None else cost * ratio
+        if self.run_start is not None:
+            self.eta = self.run_start + timedelta(minutes=(completed + n - k) * self.bucket_minutes)
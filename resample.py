@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from math import gcd
+
+
+def _overlaps(src_len: int, from_minutes: int, to_minutes: int):
+    # yields (src_index, dst_index, overlap_minutes) for every overlapping pair
+    for i in range(src_len):
+        start = i * from_minutes
+        end = start + from_minutes
+        cur = start
+        while cur < end:
+            j = cur // to_minutes
+            seg_end = min(end, (j + 1) * to_minutes)
+            yield i, j, seg_end - cur
+            cur = seg_end
+
+
+def resample_kwh(values: list[float], from_minutes: int, to_minutes: int) -> list[float]:
+    # energy conserving, each source bucket is spread evenly over its own span
+    if from_minutes == to_minutes or not values:
+        return list(values)
+
+    if to_minutes % from_minutes == 0:
+        factor = to_minutes // from_minutes
+        return [float(sum(values[i : i + factor])) for i in range(0, len(values), factor)]
+
+    out_len = (len(values) * from_minutes + to_minutes - 1) // to_minutes
+    out = [0.0] * out_len
+    for i, j, minutes in _overlaps(len(values), from_minutes, to_minutes):
+        out[j] += values[i] * minutes / from_minutes
+    return out
+
+
+def resample_counts(counts: list[int], from_minutes: int, to_minutes: int) -> list[int]:
+    # a target bucket has seen as many runs as the best covered source bucket feeding it
+    if from_minutes == to_minutes or not counts:
+        return list(counts)
+
+    out_len = (len(counts) * from_minutes + to_minutes - 1) // to_minutes
+    out = [0] * out_len
+    for i, j, _ in _overlaps(len(counts), from_minutes, to_minutes):
+        if counts[i] > out[j]:
+            out[j] = counts[i]
+    return out
+
+
+def projection_minutes(bucket_minutes: int, slot_minutes: int = 15) -> int:
+    # coarsest grid that still lines up with both the curve and the price slots
+    if slot_minutes % bucket_minutes == 0:
+        return slot_minutes
+    return gcd(bucket_minutes, slot_minutes)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import logging
+import time
 from datetime import datetime
 from typing import Any
 
@@ -7,6 +9,8 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.event import async_track_state_change_event, async_call_later
+from homeassistant.util import dt as dt_util
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.components.sensor import SensorEntity
 
 from .const import (
@@ -17,16 +21,41 @@ from .const import (
     CONF_WAIT_TIME_S,
     CONF_EXPECTED_RUNTIME_S,
     CONF_PRICE_ENTITY,
+    CONF_FAST_INGEST,
+    CONF_BUCKET_MINUTES,
+    CONF_INTEGRATION_METHOD,
     BUCKET_MINUTES,
+    COST_EXECUTOR_THRESHOLD,
+    RUN_CHECKPOINT_DELAY_S,
+    RUN_CHECKPOINT_MAX_AGE_S,
+    EVENT_RUN_QUARANTINED,
 )
 from .curve_tracker import CurveTracker
-from .storage import CurveStorage, CurveState
+from .progress import RunProgress
+from .integration import INTEGRATION_LEFT
+from .curve_state import CurveState
+from .storage import CurveStorage
 from .price_calc import (
     parse_tibber_prices_attributes,
-    compute_start_costs_quarters,
+    compute_day_start_costs,
+    estimate_cost_work,
     best_start,
     PriceTimeline,
 )
+from .profiling import (
+    PerfStats,
+    TIMED_NAMES,
+    TIMED_HANDLE_POWER,
+    TIMED_PARSE_PRICES,
+    TIMED_COMPUTE_COSTS,
+    TIMED_ATTRIBUTES,
+    TIMED_STORAGE_SAVE,
+    COUNTER_RECOMPUTES,
+    COUNTER_RECOMPUTES_EXECUTOR,
+    COUNTER_RECOMPUTES_DROPPED,
+)
+
+_LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(
@@ -40,6 +69,9 @@ async def async_setup_entry(
     wait_time_s = int(entry.data[CONF_WAIT_TIME_S])
     expected_runtime_s = int(entry.data.get(CONF_EXPECTED_RUNTIME_S, 0))
     price_entity = entry.data.get(CONF_PRICE_ENTITY)
+    fast_ingest = bool(entry.data.get(CONF_FAST_INGEST, False))
+    bucket_minutes = int(entry.data.get(CONF_BUCKET_MINUTES, BUCKET_MINUTES))
+    integration_method = entry.data.get(CONF_INTEGRATION_METHOD, INTEGRATION_LEFT)
 
     storage = CurveStorage(hass, entry.entry_id)
 
@@ -52,14 +84,18 @@ async def async_setup_entry(
         wait_time_s=wait_time_s,
         expected_runtime_s=expected_runtime_s,
         price_entity=price_entity,
+        fast_ingest=fast_ingest,
+        bucket_minutes=bucket_minutes,
+        integration_method=integration_method,
         storage=storage,
     )
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = sensor
 
-    async_add_entities([sensor], update_before_add=True)
-    await sensor.async_start_listening()
+    timing_sensors = [PowerCurveTimingSensor(entry, name, sensor.perf, timed) for timed in TIMED_NAMES]
+
+    async_add_entities([sensor, *timing_sensors], update_before_add=True)
 
 
 class PowerCurveSensor(SensorEntity):
@@ -75,11 +111,15 @@ class PowerCurveSensor(SensorEntity):
         wait_time_s: int,
         expected_runtime_s: int,
         price_entity: str | None,
+        fast_ingest: bool,
+        bucket_minutes: int,
+        integration_method: str,
         storage: CurveStorage,
     ) -> None:
         self.hass = hass
         self.entry = entry
         self._storage = storage
+        self.perf = PerfStats()
 
         self._attr_name = name
         self._attr_unique_id = f"{DOMAIN}:{entry.entry_id}"
@@ -100,13 +140,48 @@ class PowerCurveSensor(SensorEntity):
         self._best_today: tuple[int | None, float | None] = (None, None)
         self._best_tomorrow: tuple[int | None, float | None] = (None, None)
 
+        # bumped on every recompute, executor results from an older generation are dropped
+        self._cost_generation = 0
+
+        self._checkpoint_due: float | None = None
+
+        self._progress = RunProgress()
+
         @callback
         def _on_state_updated() -> None:
             self.hass.async_create_task(self._async_recompute_costs())
+            self._async_update_progress(dt_util.utcnow())
             self.async_write_ha_state()
 
+        @callback
+        def _on_bucket_boundary(now: datetime) -> None:
+            # at most one state write per bucket while a run is in progress
+            if self._async_update_progress(now):
+                self.async_write_ha_state()
+
         async def _persist() -> None:
+            t0 = time.perf_counter()
             await self._storage.save(self._tracker.curve_state)
+            self.perf.record(TIMED_STORAGE_SAVE, time.perf_counter() - t0)
+
+        @callback
+        def _on_checkpoint_requested() -> None:
+            self._async_checkpoint_run(RUN_CHECKPOINT_DELAY_S)
+
+        @callback
+        def _on_run_quarantined(record: dict[str, Any]) -> None:
+            self.hass.bus.async_fire(
+                EVENT_RUN_QUARANTINED,
+                {
+                    "entry_id": self.entry.entry_id,
+                    "entity_id": self.entity_id,
+                    "name": name,
+                    "anomaly_score": round(record["anomaly_score"], 3),
+                    "total_kwh": round(record["total_kwh"], 4),
+                    "duration_minutes": record["duration_minutes"],
+                    "finished": record["finished"],
+                },
+            )
 
         def _schedule_call_later(delay_s: int, async_cb):
             return async_call_later(self.hass, delay_s, async_cb)
@@ -118,16 +193,31 @@ class PowerCurveSensor(SensorEntity):
             schedule_call_later=_schedule_call_later,
             on_state_updated=_on_state_updated,
             on_persist_requested=_persist,
+            fast_ingest=fast_ingest,
+            bucket_minutes=bucket_minutes,
+            integration_method=integration_method,
+            on_checkpoint_requested=_on_checkpoint_requested,
+            on_bucket_boundary=_on_bucket_boundary,
+            on_run_quarantined=_on_run_quarantined,
         )
 
+    @property
+    def tracker(self) -> CurveTracker:
+        return self._tracker
+
     async def async_added_to_hass(self) -> None:
         loaded = await self._storage.load()
         await self._tracker.load_state(loaded)
+        await self._async_resume_run()
 
         await self._async_refresh_price_timeline_from_state()
         await self._async_recompute_costs()
 
+        # only listen once the run is resumed, an earlier power event would start a new run
+        await self.async_start_listening()
+
     async def async_will_remove_from_hass(self) -> None:
+        self._tracker.stop()
         if self._unsub_power is not None:
             self._unsub_power()
             self._unsub_power = None
@@ -135,6 +225,11 @@ class PowerCurveSensor(SensorEntity):
             self._unsub_price()
             self._unsub_price = None
 
+        if self._tracker.run.in_run:
+            # awaited, a reloaded entry reads the checkpoint as soon as it is set up
+            self._checkpoint_due = None
+            await self._storage.save_run(self._tracker.run_snapshot())
+
         domain_data = self.hass.data.get(DOMAIN, {})
         if domain_data.get(self.entry.entry_id) is self:
             domain_data.pop(self.entry.entry_id, None)
@@ -151,7 +246,10 @@ class PowerCurveSensor(SensorEntity):
             now: datetime = new.last_updated
             old_str = old.state if old is not None else None
             new_str = new.state
+            self.perf.power_event()
+            t0 = time.perf_counter()
             await self._tracker.handle_power_change(old_str, new_str, now)
+            self.perf.record(TIMED_HANDLE_POWER, time.perf_counter() - t0)
 
         self._unsub_power = async_track_state_change_event(
             self.hass,
@@ -164,6 +262,7 @@ class PowerCurveSensor(SensorEntity):
             async def _handle_price(event) -> None:
                 await self._async_refresh_price_timeline_from_event(event)
                 await self._async_recompute_costs()
+                self._async_update_progress(dt_util.utcnow(), rebuild=True)
                 self.async_write_ha_state()
 
             self._unsub_price = async_track_state_change_event(
@@ -175,16 +274,131 @@ class PowerCurveSensor(SensorEntity):
     async def async_reset_curve_state(self) -> None:
         await self._tracker.load_state(CurveState.empty())
 
-        self._tracker.run.in_run = False
-        self._tracker.run.run_start_ts = None
-        self._tracker.run.below_standby_since = None
-        self._tracker.run.current_run_buckets_kwh = []
-        self._tracker.last_ts = None
-        self._tracker.last_power_w = None
+        self._tracker.reset_run()
+        self._progress.reset()
+        self._checkpoint_due = None
+        await self._storage.clear_run()
 
         await self._async_recompute_costs()
         self.async_write_ha_state()
 
+    async def async_import_curve_state(self, state: CurveState) -> None:
+        await self._tracker.load_state(state)
+        await self._storage.save(self._tracker.curve_state)
+
+        await self._async_recompute_costs()
+        self._async_update_progress(dt_util.utcnow(), rebuild=True)
+        self.async_write_ha_state()
+
+    async def async_accept_quarantined_runs(self) -> int:
+        count = await self._tracker.accept_quarantined_runs()
+        if count:
+            self._async_update_progress(dt_util.utcnow(), rebuild=True)
+            self.async_write_ha_state()
+        return count
+
+    @callback
+    def _async_update_progress(self, now: datetime, rebuild: bool = False) -> bool:
+        run = self._tracker.run
+        if not run.in_run or run.run_start_ts is None:
+            if self._progress.run_start is not None:
+                self._progress.reset()
+            return False
+
+        completed = self._tracker.completed_buckets(now)
+        if rebuild or self._progress.run_start != run.run_start_ts:
+            tl = self._price_timeline
+            self._progress.start(
+                run.run_start_ts,
+                list(self._tracker.curve_state.mean_kwh_per_interval),
+                self._tracker.bucket_minutes,
+                None if tl is None else tl.all_quarters,
+                None if tl is None else dt_util.start_of_local_day(),
+            )
+        elif completed == self._progress.completed_buckets:
+            return False
+
+        self._progress.update(completed, run.current_run_buckets_kwh)
+        return True
+
+    @callback
+    def _async_checkpoint_run(self, delay_s: float) -> None:
+        if not self._tracker.run.in_run:
+            self._checkpoint_due = None
+            self.hass.async_create_task(self._storage.clear_run())
+            return
+
+        # a pending delayed write snapshots the run when it fires, so don't push it back
+        now = time.monotonic()
+        if self._checkpoint_due is not None and now < self._checkpoint_due:
+            return
+        self._checkpoint_due = now + delay_s
+        self._storage.schedule_run_checkpoint(self._tracker.run_snapshot, delay_s)
+
+    async def _async_resume_run(self) -> None:
+        if self._tracker.run.in_run:
+            return
+
+        data = await self._storage.load_run()
+        if data is None:
+            return
+
+        now = dt_util.utcnow()
+        if not self._tracker.restore_run(data):
+            await self._storage.clear_run()
+            return
+
+        last_ts = self._tracker.last_ts
+        if last_ts is None or (now - last_ts).total_seconds() > RUN_CHECKPOINT_MAX_AGE_S:
+            _LOGGER.debug("%s: discarding stale run checkpoint from %s", self.entity_id, last_ts)
+            self._tracker.reset_run()
+            await self._storage.clear_run()
+            return
+
+        samples = await self._async_power_history(last_ts, now)
+        await self._tracker.replay_power_history(samples, self._restart_ts(last_ts))
+        await self._tracker.rearm_cutoff(now)
+
+        # integration picks up again from the live reading
+        current = self.hass.states.get(self._power_entity)
+        if current is not None and self._tracker.run.in_run:
+            await self._tracker.handle_power_change(None, current.state, now)
+
+        _LOGGER.debug(
+            "%s: resumed run started %s, replayed %d power samples, in run %s",
+            self.entity_id,
+            data.get("run_start_ts"),
+            len(samples),
+            self._tracker.run.in_run,
+        )
+
+    def _restart_ts(self, last_ts: datetime) -> datetime:
+        # start of the current recorder run, when it is not known everything after the
+        # checkpoint is treated as recorded after the restart
+        if "recorder" not in self.hass.config.components:
+            return last_ts
+
+        from homeassistant.components.recorder import get_instance
+
+        runs = getattr(get_instance(self.hass), "recorder_runs_manager", None)
+        recording_start = getattr(runs, "recording_start", None)
+        return last_ts if recording_start is None else recording_start
+
+    async def _async_power_history(self, start: datetime, end: datetime) -> list[tuple[datetime, str | None]]:
+        if "recorder" not in self.hass.config.components:
+            return []
+
+        from homeassistant.components.recorder import get_instance, history
+
+        states = await get_instance(self.hass).async_add_executor_job(
+            history.state_changes_during_period,
+            self.hass,
+            start,
+            end,
+            self._power_entity,
+        )
+        return [(st.last_updated, st.state) for st in states.get(self._power_entity, [])]
+
     async def _async_refresh_price_timeline_from_state(self) -> None:
         if not self._price_entity:
             self._price_timeline = None
@@ -193,8 +407,7 @@ class PowerCurveSensor(SensorEntity):
         if st is None:
             self._price_timeline = None
             return
-        tl = parse_tibber_prices_attributes(dict(st.attributes))
-        self._price_timeline = tl
+        self._price_timeline = self._parse_prices(dict(st.attributes))
 
     async def _async_refresh_price_timeline_from_event(self, event) -> None:
         if not self._price_entity:
@@ -204,10 +417,18 @@ class PowerCurveSensor(SensorEntity):
         if new is None:
             self._price_timeline = None
             return
-        tl = parse_tibber_prices_attributes(dict(new.attributes))
-        self._price_timeline = tl
+        self._price_timeline = self._parse_prices(dict(new.attributes))
+
+    def _parse_prices(self, attrs: dict[str, Any]) -> PriceTimeline | None:
+        t0 = time.perf_counter()
+        tl = parse_tibber_prices_attributes(attrs)
+        self.perf.record(TIMED_PARSE_PRICES, time.perf_counter() - t0)
+        return tl
 
     async def _async_recompute_costs(self) -> None:
+        self._cost_generation += 1
+        generation = self._cost_generation
+
         if not self._price_timeline:
             self._start_cost_today = None
             self._start_cost_tomorrow = None
@@ -216,23 +437,59 @@ class PowerCurveSensor(SensorEntity):
             return
 
         curve = list(self._tracker.curve_state.mean_kwh_per_interval)
-        all_quarters = self._price_timeline.all_quarters
+        bucket_minutes = self._tracker.bucket_minutes
+        all_quarters = list(self._price_timeline.all_quarters)
+        work = estimate_cost_work(curve, bucket_minutes)
+        self.perf.count(COUNTER_RECOMPUTES)
+
+        if work <= COST_EXECUTOR_THRESHOLD:
+            t0 = time.perf_counter()
+            today, tomorrow = compute_day_start_costs(curve, all_quarters, bucket_minutes)
+            self.perf.record(TIMED_COMPUTE_COSTS, time.perf_counter() - t0)
+            self._apply_costs(today, tomorrow)
+            _LOGGER.debug(
+                "%s: cost projection on loop, work=%d, blocked %.2f ms",
+                self.entity_id,
+                work,
+                (time.perf_counter() - t0) * 1000.0,
+            )
+            return
 
-        self._start_cost_today = compute_start_costs_quarters(
-            device_kwh_5m=curve,
-            all_price_quarters=all_quarters,
-            start_offset_quarters=0,
-            start_count=96,
+        self.perf.count(COUNTER_RECOMPUTES_EXECUTOR)
+        t0 = time.perf_counter()
+        today, tomorrow = await self.hass.async_add_executor_job(
+            compute_day_start_costs, curve, all_quarters, bucket_minutes
         )
-        self._start_cost_tomorrow = compute_start_costs_quarters(
-            device_kwh_5m=curve,
-            all_price_quarters=all_quarters,
-            start_offset_quarters=96,
-            start_count=96,
+        self.perf.record(TIMED_COMPUTE_COSTS, time.perf_counter() - t0)
+        if generation != self._cost_generation:
+            self.perf.count(COUNTER_RECOMPUTES_DROPPED)
+            _LOGGER.debug(
+                "%s: dropping superseded cost projection, work=%d",
+                self.entity_id,
+                work,
+            )
+            return
+
+        t1 = time.perf_counter()
+        self._apply_costs(today, tomorrow)
+        self.async_write_ha_state()
+        _LOGGER.debug(
+            "%s: cost projection in executor, work=%d, took %.2f ms, blocked %.2f ms",
+            self.entity_id,
+            work,
+            (t1 - t0) * 1000.0,
+            (time.perf_counter() - t1) * 1000.0,
         )
 
-        self._best_today = best_start(self._start_cost_today)
-        self._best_tomorrow = best_start(self._start_cost_tomorrow)
+    def _apply_costs(
+        self,
+        today: list[float | None],
+        tomorrow: list[float | None],
+    ) -> None:
+        self._start_cost_today = today
+        self._start_cost_tomorrow = tomorrow
+        self._best_today = best_start(today)
+        self._best_tomorrow = best_start(tomorrow)
 
     @property
     def native_value(self) -> Any:
@@ -240,6 +497,12 @@ class PowerCurveSensor(SensorEntity):
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
+        t0 = time.perf_counter()
+        attrs = self._build_attributes()
+        self.perf.record(TIMED_ATTRIBUTES, time.perf_counter() - t0)
+        return attrs
+
+    def _build_attributes(self) -> dict[str, Any]:
         state = self._tracker.curve_state
 
         mean_raw = state.mean_kwh_per_interval
@@ -260,16 +523,24 @@ class PowerCurveSensor(SensorEntity):
                 out.append(None if v is None else round(v, dp))
             return out
 
+        progress = self._progress
+        in_progress = progress.run_start is not None
+
+        def round_opt(v: float | None, dp: int) -> float | None:
+            return None if v is None else round(v, dp)
+
         best_today_i, best_today_cost = self._best_today
         best_tomorrow_i, best_tomorrow_cost = self._best_tomorrow
 
         return {
             "version": 2,
-            "interval_minutes": BUCKET_MINUTES,
+            "interval_minutes": self._tracker.bucket_minutes,
             "power_entity": self._power_entity,
             "standby_w": self._standby_w,
             "wait_time_s": self._wait_time_s,
             "expected_runtime_s": self._expected_runtime_s,
+            "fast_ingest": self._tracker.fast_ingest,
+            "integration_method": self._tracker.integration_method,
             "runs": state.runs,
             "mean_kwh_per_interval": mean_raw,
             "mean_kwh_per_interval_4dp": mean_4dp,
@@ -279,6 +550,9 @@ class PowerCurveSensor(SensorEntity):
             "last_run_total_kwh": round(state.last_run_total_kwh, 4),
             "last_run_duration_minutes": state.last_run_duration_minutes,
             "last_updated": state.last_updated_iso,
+            "last_run_anomaly_score": round_opt(state.last_run_anomaly_score, 3),
+            "last_run_quarantined": state.last_run_quarantined,
+            "quarantined_runs": len(state.quarantined_runs),
             "price_entity": self._price_entity,
             "price_resolution_minutes": price_res,
             "start_cost_today": self._start_cost_today,
@@ -289,4 +563,35 @@ class PowerCurveSensor(SensorEntity):
             "best_start_today_cost": None if best_today_cost is None else round(best_today_cost, 4),
             "best_start_tomorrow_quarter_index": best_tomorrow_i,
             "best_start_tomorrow_cost": None if best_tomorrow_cost is None else round(best_tomorrow_cost, 4),
+            "run_in_progress": self._tracker.run.in_run,
+            "run_completed_intervals": progress.completed_buckets if in_progress else None,
+            "run_remaining_kwh": round_opt(progress.remaining_kwh, 4),
+            "run_remaining_minutes": progress.remaining_minutes,
+            "run_remaining_cost": round_opt(progress.remaining_cost, 4),
+            "run_eta": None if progress.eta is None else progress.eta.isoformat(timespec="seconds"),
         }
+
+
+class PowerCurveTimingSensor(SensorEntity):
+    _attr_has_entity_name = True
+    _attr_icon = "mdi:timer-outline"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_native_unit_of_measurement = "ms"
+    _attr_should_poll = True
+
+    def __init__(self, entry: ConfigEntry, name: str, perf: PerfStats, timed: str) -> None:
+        self._perf = perf
+        self._timed = timed
+
+        self._attr_name = f"{name} {timed.replace('_', ' ')} time"
+        self._attr_unique_id = f"{DOMAIN}:{entry.entry_id}:timing:{timed}"
+
+    @property
+    def native_value(self) -> Any:
+        mean = self._perf.timings[self._timed].mean_ms
+        return None if mean is None else round(mean, 4)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return self._perf.timings[self._timed].as_dict()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import logging
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+
+from .bundle import decode_profile, encode_profile, read_bundle, write_bundle
+from .const import CONF_NAME, CONF_POWER_ENTITY, DOMAIN
+from .curve_state import CurveState
+from .storage import CurveStorage
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_EXPORT_CURVES = "export_curves"
+SERVICE_IMPORT_CURVES = "import_curves"
+
+ATTR_PATH = "path"
+ATTR_ENTRY_ID = "entry_id"
+ATTR_PROFILE = "profile"
+
+EXPORT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+IMPORT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_PROFILE): cv.string,
+    }
+)
+
+
+def _entry_name(entry: ConfigEntry) -> str:
+    return entry.data.get(CONF_NAME) or entry.title
+
+
+def _check_path(hass: HomeAssistant, path: str) -> None:
+    if not hass.config.is_allowed_path(path):
+        raise HomeAssistantError(f"Access to {path} is not allowed, add it to allowlist_external_dirs")
+
+
+def _selected_entries(hass: HomeAssistant, entry_ids: list[str] | None) -> list[ConfigEntry]:
+    entries = hass.config_entries.async_entries(DOMAIN)
+    if not entry_ids:
+        return entries
+
+    by_id = {entry.entry_id: entry for entry in entries}
+    unknown = [entry_id for entry_id in entry_ids if entry_id not in by_id]
+    if unknown:
+        raise HomeAssistantError(f"Unknown power curve entries: {', '.join(unknown)}")
+    return [by_id[entry_id] for entry_id in entry_ids]
+
+
+async def _async_load_state(hass: HomeAssistant, entry: ConfigEntry) -> CurveState:
+    sensor = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if sensor is not None:
+        return sensor.tracker.curve_state
+    return await CurveStorage(hass, entry.entry_id).load()
+
+
+async def _async_store_state(hass: HomeAssistant, entry: ConfigEntry, state: CurveState) -> None:
+    sensor = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if sensor is not None:
+        await sensor.async_import_curve_state(state)
+        return
+    await CurveStorage(hass, entry.entry_id).save(state)
+
+
+async def _async_export_curves(hass: HomeAssistant, call: ServiceCall) -> None:
+    path = call.data[ATTR_PATH]
+    _check_path(hass, path)
+
+    profiles = []
+    for entry in _selected_entries(hass, call.data.get(ATTR_ENTRY_ID)):
+        state = await _async_load_state(hass, entry)
+        profiles.append(
+            encode_profile(
+                _entry_name(entry),
+                state.to_dict(),
+                power_entity=entry.data.get(CONF_POWER_ENTITY),
+            )
+        )
+
+    try:
+        await hass.async_add_executor_job(write_bundle, path, profiles)
+    except OSError as err:
+        raise HomeAssistantError(f"Could not write {path}: {err}") from err
+
+    _LOGGER.info("Exported %d power curve profiles to %s", len(profiles), path)
+
+
+async def _async_import_curves(hass: HomeAssistant, call: ServiceCall) -> None:
+    path = call.data[ATTR_PATH]
+    _check_path(hass, path)
+
+    try:
+        profiles = await hass.async_add_executor_job(read_bundle, path)
+    except (OSError, ValueError) as err:
+        raise HomeAssistantError(f"Could not read {path}: {err}") from err
+
+    by_name = {str(p["name"]): p for p in profiles}
+    profile_name = call.data.get(ATTR_PROFILE)
+    entry_ids = call.data.get(ATTR_ENTRY_ID)
+
+    if profile_name is None and entry_ids and len(profiles) == 1:
+        profile_name = str(profiles[0]["name"])
+    if profile_name is not None and not entry_ids:
+        raise HomeAssistantError(f"Pass entry_id with profile, {profile_name} would replace the curves of every device")
+    if profile_name is not None and profile_name not in by_name:
+        raise HomeAssistantError(f"Profile {profile_name} not found in {path}")
+
+    targets: list[tuple[ConfigEntry, CurveState]] = []
+    for entry in _selected_entries(hass, entry_ids):
+        # one named profile seeds every selected entry, otherwise match entries by name
+        profile = by_name[profile_name] if profile_name is not None else by_name.get(_entry_name(entry))
+        if profile is None:
+            if entry_ids:
+                raise HomeAssistantError(f"No profile named {_entry_name(entry)} in {path}, pass a profile")
+            continue
+        # every profile is decoded before the first device is replaced
+        try:
+            state = CurveState.from_dict(decode_profile(profile))
+        except (AttributeError, KeyError, TypeError, ValueError) as err:
+            raise HomeAssistantError(f"Profile {profile.get('name')} in {path} is malformed: {err}") from err
+        targets.append((entry, state))
+
+    for entry, state in targets:
+        await _async_store_state(hass, entry, state)
+
+    _LOGGER.info("Imported %d power curve profiles from %s", len(targets), path)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    if hass.services.has_service(DOMAIN, SERVICE_EXPORT_CURVES):
+        return
+
+    async def _export(call: ServiceCall) -> None:
+        await _async_export_curves(hass, call)
+
+    async def _import(call: ServiceCall) -> None:
+        await _async_import_curves(hass, call)
+
+    hass.services.async_register(DOMAIN, SERVICE_EXPORT_CURVES, _export, schema=EXPORT_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_IMPORT_CURVES, _import, schema=IMPORT_SCHEMA)